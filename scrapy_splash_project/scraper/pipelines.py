@@ -5,13 +5,30 @@
 
 
 # useful for handling different item types with a single interface
-import hashlib
-import json
+import functools
 import os
+import threading
+from collections import defaultdict
 from pathlib import Path
 from urllib.parse import urlparse
 
+import orjson
 from itemadapter import ItemAdapter
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.threads import deferToThread
+
+from scraper.utils import url_hash as make_url_hash
+
+# Characters not allowed in file/folder names, all mapped to underscore
+_SANITIZE_TABLE = str.maketrans({c: "_" for c in '/\\:*?"<>|'})
+
+
+@functools.lru_cache(maxsize=4096)
+def sanitize_filename(name):
+    """Remove invalid characters from filename/folder name"""
+    # Replace invalid characters with underscore in one pass, strip leading/
+    # trailing dots and spaces, and fall back to "page" if nothing is left
+    return name.translate(_SANITIZE_TABLE).strip(". ") or "page"
 
 
 class ScraperPipeline:
@@ -30,6 +47,10 @@ class RagPipeline:
         page1_hash.json
         subfolder/
           page2_hash.json
+
+    With RAG_OUTPUT_FORMAT = "jsonl" items are instead appended to one
+    JSON Lines file per domain (output/domain.com/pages.jsonl), buffered
+    in memory and flushed every RAG_JSONL_FLUSH_BYTES bytes.
     """
 
     def __init__(self):
@@ -39,40 +60,55 @@ class RagPipeline:
         project_root = Path(__file__).parent.parent
         self.output_dir = project_root / "output"
         self.files_created = 0
+        # Folders already created during this crawl (skip repeated mkdir calls)
+        self._dirs_created = set()
+
+        # JSONL mode: pending lines and their size per output file
+        self._buffers = defaultdict(list)
+        self._bytes = defaultdict(int)
+        self._write_lock = threading.Lock()
+        # JSONL files written during this crawl (truncated on first write)
+        self._files_opened = set()
+        self.items_buffered = 0
 
     def open_spider(self, spider):
         """Create base output directory"""
+        self.output_format = spider.settings.get("RAG_OUTPUT_FORMAT", "json")
+        if self.output_format not in ("json", "jsonl"):
+            raise ValueError(
+                f"RAG_OUTPUT_FORMAT must be 'json' or 'jsonl', "
+                f"got {self.output_format!r}"
+            )
+        self.flush_bytes = spider.settings.getint(
+            "RAG_JSONL_FLUSH_BYTES", 8 * 1024 * 1024
+        )
+
         self.output_dir.mkdir(exist_ok=True)
         spider.logger.info(
             f"RAG Pipeline initialized. Output dir: {self.output_dir.absolute()}"
         )
 
     def close_spider(self, spider):
-        """Log summary"""
-        spider.logger.info(f"RAG Pipeline: Created {self.files_created} JSON files")
+        """Flush pending JSONL lines and log summary"""
+        for filepath in list(self._buffers):
+            self._append_lines(filepath, self._take_buffer(filepath))
+
+        if self.output_format == "jsonl":
+            spider.logger.info(
+                f"RAG Pipeline: Wrote {self.items_buffered} items to JSONL files"
+            )
+        else:
+            spider.logger.info(
+                f"RAG Pipeline: Created {self.files_created} JSON files"
+            )
 
-    def process_item(self, item, spider):
+    async def process_item(self, item, spider):
         """Save item as JSON file in appropriate folder"""
+        domain_folder = self._domain_folder(item.get("domain", "unknown"))
 
-        # Create domain folder (handle subdomains properly)
-        domain = item.get("domain", "unknown")
-
-        # Parse domain to handle subdomains
-        # e.g., "example.integreat.app" -> folder: integreat_app/example
-        # e.g., "integreat.app" -> folder: integreat_app
-        domain_parts = domain.split(".")
-
-        if len(domain_parts) > 2:
-            # Has subdomain: example.integreat.app
-            base_domain = "_".join(domain_parts[-2:])  # integreat_app
-            subdomain = "_".join(domain_parts[:-2])  # example
-            domain_folder = self.output_dir / base_domain / subdomain
-        else:
-            # No subdomain: integreat.app
-            base_domain = "_".join(domain_parts)  # integreat_app
-            domain_folder = self.output_dir / base_domain
-
-        domain_folder.mkdir(parents=True, exist_ok=True)
+        if self.output_format == "jsonl":
+            await self._buffer_item(domain_folder / "pages.jsonl", item, spider)
+            return item
 
         # Create subfolder structure based on URL path
         path_parts = item.get("path_parts", [])
@@ -81,44 +117,95 @@ class RagPipeline:
         # Create subfolders for all but the last part (which is the page)
         if len(path_parts) > 1:
             for part in path_parts[:-1]:
-                current_folder = current_folder / self.sanitize_filename(part)
-                current_folder.mkdir(exist_ok=True)
+                current_folder = current_folder / sanitize_filename(part)
+                self._ensure_dir(current_folder)
 
         # Generate filename from URL hash or last path part
-        url_hash = item.get("url_hash", hashlib.md5(item["url"].encode()).hexdigest())
+        url_hash = item.get("url_hash") or make_url_hash(item["url"])
 
         # Use last path part + hash for better readability
         if path_parts:
-            last_part = self.sanitize_filename(path_parts[-1])
+            last_part = sanitize_filename(path_parts[-1])
             filename = f"{last_part}_{url_hash[:8]}.json"
         else:
             filename = f"index_{url_hash[:8]}.json"
 
         filepath = current_folder / filename
 
-        # Save JSON
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(dict(item), f, ensure_ascii=False, indent=2)
+        # Save JSON in a worker thread so disk I/O doesn't block the reactor
+        await maybe_deferred_to_future(
+            deferToThread(self._write_json, filepath, dict(item))
+        )
 
         self.files_created += 1
         spider.logger.info(f"Saved: {filepath}")
 
         return item
 
-    def sanitize_filename(self, name):
-        """Remove invalid characters from filename/folder name"""
-        # Replace invalid characters with underscore
-        name = name.replace("/", "_").replace("\\", "_")
-        name = name.replace(":", "_").replace("*", "_")
-        name = name.replace("?", "_").replace('"', "_")
-        name = name.replace("<", "_").replace(">", "_")
-        name = name.replace("|", "_")
-
-        # Remove leading/trailing dots and spaces
-        name = name.strip(". ")
-
-        # If empty after sanitization, use default
-        if not name:
-            name = "page"
+    def _domain_folder(self, domain):
+        """Return (and create) the output folder for a domain"""
+        # Parse domain to handle subdomains
+        # e.g., "example.integreat.app" -> folder: integreat_app/example
+        # e.g., "integreat.app" -> folder: integreat_app
+        head, sep, tld = domain.rpartition(".")
+        host, sep2, sld = head.rpartition(".")
 
-        return name
+        if sep2:
+            # Has subdomain: example.integreat.app
+            base_domain = f"{sld}_{tld}"  # integreat_app
+            subdomain = host.replace(".", "_")  # example
+            domain_folder = self.output_dir / base_domain / subdomain
+        elif sep:
+            # No subdomain: integreat.app
+            base_domain = f"{head}_{tld}"  # integreat_app
+            domain_folder = self.output_dir / base_domain
+        else:
+            # Single label: localhost
+            domain_folder = self.output_dir / domain
+
+        self._ensure_dir(domain_folder)
+        return domain_folder
+
+    async def _buffer_item(self, filepath, item, spider):
+        """Add item as a JSON line to filepath's buffer, flush when full"""
+        line = orjson.dumps(dict(item), option=orjson.OPT_NON_STR_KEYS) + b"\n"
+        self._buffers[filepath].append(line)
+        self._bytes[filepath] += len(line)
+        self.items_buffered += 1
+
+        if self._bytes[filepath] >= self.flush_bytes:
+            lines = self._take_buffer(filepath)
+            await maybe_deferred_to_future(
+                deferToThread(self._append_lines, filepath, lines)
+            )
+            spider.logger.info(f"Flushed {len(lines)} items to {filepath}")
+
+    def _take_buffer(self, filepath):
+        """Remove and return pending lines for filepath"""
+        self._bytes.pop(filepath, None)
+        return self._buffers.pop(filepath, [])
+
+    def _append_lines(self, filepath, lines):
+        """Append lines to filepath in one write (may run in thread pool)"""
+        if not lines:
+            return
+        with self._write_lock:
+            # Start each file fresh per crawl, like the per-page JSON files
+            mode = "ab" if filepath in self._files_opened else "wb"
+            self._files_opened.add(filepath)
+            with open(filepath, mode) as f:
+                f.write(b"".join(lines))
+
+    def _ensure_dir(self, folder):
+        """Create folder once per crawl, skipping folders already created"""
+        if folder not in self._dirs_created:
+            folder.mkdir(parents=True, exist_ok=True)
+            self._dirs_created.add(folder)
+
+    @staticmethod
+    def _write_json(filepath, data):
+        """Serialize data to filepath (runs in the reactor thread pool)"""
+        # orjson writes UTF-8 directly, same output as ensure_ascii=False
+        filepath.write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
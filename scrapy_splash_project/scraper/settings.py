@@ -29,6 +29,20 @@ SPLASH_URL = "http://localhost:8050"
 CONCURRENT_REQUESTS_PER_DOMAIN = 1
 DOWNLOAD_DELAY = 1
 
+# Store page HTML in RAG items next to body_text:
+#   True   - plain HTML in "body_html"
+#   "zstd" - zstd-compressed, base64-encoded HTML in "body_html_zstd_b64"
+#            (requires: pip install zstandard)
+#   False  - don't store HTML, only clean text (smallest output)
+STORE_BODY_HTML = True
+
+# RAG pipeline output format:
+#   "json"  - one JSON file per page, folders mirror the site structure
+#   "jsonl" - one pages.jsonl file per domain, written in batches
+RAG_OUTPUT_FORMAT = "json"
+# In "jsonl" mode, flush a domain's buffered lines once they reach this size
+RAG_JSONL_FLUSH_BYTES = 8 * 1024 * 1024
+
 # Disable cookies (enabled by default)
 # COOKIES_ENABLED = False
 
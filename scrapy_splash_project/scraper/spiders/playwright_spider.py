@@ -6,19 +6,46 @@ Install: pip install scrapy-playwright playwright
 Then: playwright install chromium
 
 Usage: scrapy crawl playwright -a url=https://integreat.app/staedteregion-aachen/de/wichtige-aemter
+Skip the iframe lookup on sites without iframes: -a iframe_fallback=false
 """
 
-import hashlib
+import asyncio
 import re
 from datetime import datetime
 from urllib.parse import urlparse
 
 import scrapy
+from selectolax.parser import HTMLParser
+
+from scraper.utils import body_html_fields, body_html_mode
+from scraper.utils import url_hash as make_url_hash
+
+# Collapses whitespace runs in extracted text
+_RE_WS = re.compile(r"\s+")
+
+# Visible page text, extracted by the browser instead of parsing HTML in Python
+_BODY_TEXT_JS = "() => document.body ? document.body.innerText : ''"
+
+# Returns the largest body HTML among same-origin iframes ("" if none)
+_LARGEST_IFRAME_JS = """
+() => Array.from(document.querySelectorAll("iframe"))
+    .map((i) => {
+        try {
+            return i.contentDocument?.body?.innerHTML || "";
+        } catch (e) {
+            return "";
+        }
+    })
+    .reduce((a, b) => (a.length >= b.length ? a : b), "")
+"""
 
 
 class PlaywrightSpider(scrapy.Spider):
     name = "playwright"
 
+    # Look into iframes when the main page has almost no content
+    iframe_fallback = True
+
     custom_settings = {
         "DOWNLOAD_HANDLERS": {
             "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
@@ -32,11 +59,31 @@ class PlaywrightSpider(scrapy.Spider):
         "PLAYWRIGHT_LAUNCH_OPTIONS": {
             "headless": True,
         },
+        # All requests share one persistent browser context ("default"),
+        # pages are opened in it instead of creating a context per request
+        "PLAYWRIGHT_CONTEXTS": {
+            "default": {
+                "viewport": {"width": 1920, "height": 1080},
+            },
+        },
+        "PLAYWRIGHT_MAX_CONTEXTS": 1,
+        "PLAYWRIGHT_MAX_PAGES_PER_CONTEXT": 8,
+        # HTTP cache is enabled project-wide (settings.py); Playwright requests
+        # carry no Splash args, so use the plain storage and expire after a day
+        "HTTPCACHE_STORAGE": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+        "HTTPCACHE_EXPIRATION_SECS": 86400,
     }
 
-    def __init__(self, url=None, *args, **kwargs):
+    def __init__(self, url=None, iframe_fallback=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        if iframe_fallback is not None:
+            self.iframe_fallback = str(iframe_fallback).lower() not in (
+                "0",
+                "false",
+                "no",
+            )
+
         if not url:
             raise ValueError(
                 "Please provide URL: scrapy crawl playwright -a url=https://example.com"
@@ -51,6 +98,13 @@ class PlaywrightSpider(scrapy.Spider):
         else:
             self.allowed_domains = [domain, f"www.{domain}"]
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Resolve once so an invalid STORE_BODY_HTML fails at startup
+        spider.html_mode = body_html_mode(crawler.settings)
+        return spider
+
     def start_requests(self):
         for url in self.start_urls:
             yield scrapy.Request(
@@ -66,42 +120,75 @@ class PlaywrightSpider(scrapy.Spider):
                 errback=self.errback,
             )
 
-    async def parse(self, response):
-        page = response.meta["playwright_page"]
+    async def _read_page_content(self, page, want_html):
+        """
+        Return (html, text) from the live page (or its largest iframe).
+
+        Text comes from the browser's innerText, so the full HTML is only
+        transferred from the browser when want_html is set.
+        """
+        content_html = None
 
         # Wait for content to load
         try:
             await page.wait_for_selector("body", timeout=10000)
 
-            # Get all iframes
-            frames = page.frames
-            self.logger.info(f"Found {len(frames)} frames")
-
-            # Try to get content from main frame or first iframe
-            content_html = await page.content()
+            # Try to get content from main frame
+            body_text = _RE_WS.sub(" ", await page.evaluate(_BODY_TEXT_JS)).strip()
+            if want_html:
+                content_html = await page.content()
 
             # If main content is empty, try iframes
-            if len(content_html) < 1000:
-                for frame in frames[1:]:  # Skip main frame
-                    try:
-                        frame_content = await frame.content()
-                        if len(frame_content) > len(content_html):
-                            content_html = frame_content
-                            self.logger.info(
-                                f"Using iframe content: {len(frame_content)} bytes"
-                            )
-                    except:
-                        pass
+            if self.iframe_fallback and len(body_text) < 200:
+                # Read all same-origin iframes in a single JS call
+                frame_content = await page.evaluate(_LARGEST_IFRAME_JS)
+
+                # Cross-origin iframes are not reachable from page JS,
+                # read those through Playwright (concurrently, skip main frame)
+                frames = page.frames
+                if len(frame_content) < 1000 and len(frames) > 1:
+                    self.logger.info(f"Found {len(frames)} frames")
+                    contents = await asyncio.gather(
+                        *(frame.content() for frame in frames[1:]),
+                        return_exceptions=True,
+                    )
+                    frame_content = max(
+                        (c for c in contents if isinstance(c, str)),
+                        key=len,
+                        default=frame_content,
+                    )
+
+                frame_text = self.extract_clean_text(frame_content)
+                if len(frame_text) > len(body_text):
+                    body_text = frame_text
+                    content_html = frame_content
+                    self.logger.info(
+                        f"Using iframe content: {len(frame_content)} bytes"
+                    )
 
         except Exception as e:
             self.logger.error(f"Error getting content: {e}")
             content_html = await page.content()
+            body_text = self.extract_clean_text(content_html)
 
         finally:
             await page.close()
 
+        return content_html, body_text
+
+    async def parse(self, response):
+        page = response.meta.get("playwright_page")
+        if page is None:
+            # Served from HTTP cache: no live page, body is the rendered HTML
+            content_html = response.text
+            body_text = self.extract_clean_text(content_html)
+        else:
+            content_html, body_text = await self._read_page_content(
+                page, want_html=self.html_mode is not None
+            )
+
         # Parse the response
-        url_hash = hashlib.md5(response.url.encode()).hexdigest()
+        url_hash = make_url_hash(response.url)
         parsed_url = urlparse(response.url)
         path_parts = [p for p in parsed_url.path.split("/") if p]
 
@@ -110,9 +197,6 @@ class PlaywrightSpider(scrapy.Spider):
         if title:
             title = title.strip()
 
-        # Clean text from HTML
-        body_text = self.extract_clean_text(content_html)
-
         yield {
             "url": response.url,
             "url_hash": url_hash,
@@ -125,7 +209,7 @@ class PlaywrightSpider(scrapy.Spider):
             ).get(),
             "keywords": response.css('meta[name="keywords"]::attr(content)').get(),
             "language": response.css("html::attr(lang)").get() or "unknown",
-            "body_html": content_html,
+            **body_html_fields(content_html, self.html_mode),
             "body_text": body_text,
             "text_length": len(body_text) if body_text else 0,
             "status_code": response.status,
@@ -138,25 +222,19 @@ class PlaywrightSpider(scrapy.Spider):
         if not html:
             return ""
 
-        # Remove script and style tags
-        html = re.sub(
-            r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE
-        )
-        html = re.sub(
-            r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL | re.IGNORECASE
-        )
-        html = re.sub(r"<!--.*?-->", "", html, flags=re.DOTALL)
-
-        # Remove HTML tags
-        text = re.sub(r"<[^>]+>", " ", html)
+        # Parse once with selectolax (C parser, decodes HTML entities)
+        tree = HTMLParser(html)
+        if tree.body is None:
+            return ""
 
-        # Decode HTML entities
-        from html import unescape
+        # Remove script and style tags
+        for tag in tree.css("script, style"):
+            tag.decompose()
 
-        text = unescape(text)
+        text = tree.body.text(separator=" ")
 
         # Clean whitespace
-        text = re.sub(r"\s+", " ", text)
+        text = _RE_WS.sub(" ", text)
         return text.strip()
 
     async def errback(self, failure):
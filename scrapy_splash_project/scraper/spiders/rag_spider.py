@@ -1,12 +1,35 @@
-import hashlib
-import json
 import re
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
 
+import orjson
 import scrapy
+from lxml import etree
 from scrapy_splash import SplashRequest
+from selectolax.parser import HTMLParser
+
+from scraper.utils import body_html_fields, body_html_mode
+from scraper.utils import url_hash as make_url_hash
+
+# Collapses whitespace runs in extracted text
+_RE_WS = re.compile(r"\s+")
+
+# XPath expressions used by parse, compiled once against the lxml tree
+# (skips parsel's per-call CSS -> XPath translation)
+_XP_TITLE = etree.XPath("//title/text()", smart_strings=False)
+_XP_DESCRIPTION = etree.XPath(
+    "//meta[@name='description']/@content", smart_strings=False
+)
+_XP_KEYWORDS = etree.XPath("//meta[@name='keywords']/@content", smart_strings=False)
+_XP_LANG = etree.XPath("//html/@lang", smart_strings=False)
+_XP_BODY = etree.XPath("//body")
+_XP_LINKS = etree.XPath("//a/@href", smart_strings=False)
+
+
+def _first(results):
+    """Return first XPath result or None, like SelectorList.get()"""
+    return results[0] if results else None
 
 
 class RagSpider(scrapy.Spider):
@@ -32,6 +55,11 @@ class RagSpider(scrapy.Spider):
         "DOWNLOADER_MIDDLEWARES": {
             "scrapy.downloadermiddlewares.offsite.OffsiteMiddleware": None,
         },
+        # Bloom filter keeps memory flat when following millions of links
+        "DUPEFILTER_CLASS": "scraper.bloom_dupefilter.BloomDupeFilter",
+        # HTTP cache is enabled project-wide (settings.py), expire entries
+        # after a day so re-crawls pick up content updates
+        "HTTPCACHE_EXPIRATION_SECS": 86400,
     }
 
     def __init__(self, url=None, input_file=None, *args, **kwargs):
@@ -39,6 +67,7 @@ class RagSpider(scrapy.Spider):
 
         self.start_urls = []
         self.allowed_domains = []
+        self._allowed_set = set()  # O(1) lookups while collecting domains
         self.domain_map = {}  # Maps URL to its domain for filtering
 
         # Mode 1: Single URL
@@ -61,9 +90,19 @@ class RagSpider(scrapy.Spider):
                 "  scrapy crawl rag -a input_file=input/urls_example.json"
             )
 
+        # Scrapy reads allowed_domains as a list, build it once
+        self.allowed_domains = sorted(self._allowed_set)
+
         self.logger.info(f"Allowed domains: {self.allowed_domains}")
         self.logger.info(f"Starting with {len(self.start_urls)} URLs")
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Resolve once so an invalid STORE_BODY_HTML fails at startup
+        spider.html_mode = body_html_mode(crawler.settings)
+        return spider
+
     def _add_domain_from_url(self, url):
         """Extract and add domain from URL to allowed list"""
         parsed = urlparse(url)
@@ -73,18 +112,13 @@ class RagSpider(scrapy.Spider):
         self.domain_map[url] = domain
 
         # Add both www and non-www versions
-        if domain.startswith("www."):
-            base = domain[4:]
-            if domain not in self.allowed_domains:
-                self.allowed_domains.append(domain)
-            if base not in self.allowed_domains:
-                self.allowed_domains.append(base)
-        else:
-            if domain not in self.allowed_domains:
-                self.allowed_domains.append(domain)
-            www_domain = f"www.{domain}"
-            if www_domain not in self.allowed_domains:
-                self.allowed_domains.append(www_domain)
+        self._allowed_set.update(self._domain_variants(domain))
+
+    @staticmethod
+    def _domain_variants(domain):
+        """Return set with www and non-www versions of domain"""
+        base = domain[4:] if domain.startswith("www.") else domain
+        return {base, f"www.{base}"}
 
     def _load_urls_from_file(self, input_file):
         """Load URLs from JSON input file"""
@@ -92,16 +126,19 @@ class RagSpider(scrapy.Spider):
         if not file_path.exists():
             raise FileNotFoundError(f"Input file not found: {input_file}")
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = orjson.loads(file_path.read_bytes())
 
         urls = data.get("urls", [])
         if not urls:
             raise ValueError(f"No URLs found in {input_file}")
 
-        for url in urls:
-            self.start_urls.append(url)
-            self._add_domain_from_url(url)
+        self.start_urls.extend(urls)
+
+        # Parse each URL once, then add www variants per unique domain
+        url_domains = {url: urlparse(url).netloc for url in urls}
+        self.domain_map.update(url_domains)
+        for domain in set(url_domains.values()):
+            self._allowed_set.update(self._domain_variants(domain))
 
     lua_script = """
     function main(splash, args)
@@ -122,14 +159,13 @@ class RagSpider(scrapy.Spider):
         local elapsed = 0
 
         while elapsed < max_wait do
-            -- Get body text length
-            local body = splash:select('body')
-            if body then
-                local text = body:text()
-                -- If body has substantial content (more than just "enable JS" message)
-                if text and string.len(text) > 200 then
-                    break
-                end
+            -- Get body text length (computed in JS, only a number is returned)
+            local len = splash:evaljs(
+                "document.body ? document.body.innerText.length : 0"
+            )
+            -- If body has substantial content (more than just "enable JS" message)
+            if len and len > 200 then
+                break
             end
             splash:wait(check_interval)
             elapsed = elapsed + check_interval
@@ -152,27 +188,37 @@ class RagSpider(scrapy.Spider):
                     "lua_source": self.lua_script,
                     "timeout": 120,
                 },
+                # Splash stores the script once instead of receiving it each time
+                cache_args=["lua_source"],
             )
 
     def parse(self, response):
         """Extract page content and metadata for RAG"""
 
         # Generate unique ID from URL
-        url_hash = hashlib.md5(response.url.encode()).hexdigest()
+        url_hash = make_url_hash(response.url)
+
+        # Query the parsed lxml tree directly with precompiled XPaths
+        root = response.selector.root
 
         # Extract metadata
-        title = response.css("title::text").get()
+        title = _first(_XP_TITLE(root))
         if title:
             title = title.strip()
 
-        description = response.css('meta[name="description"]::attr(content)').get()
-        keywords = response.css('meta[name="keywords"]::attr(content)').get()
+        description = _first(_XP_DESCRIPTION(root))
+        keywords = _first(_XP_KEYWORDS(root))
 
         # Extract language
-        lang = response.css("html::attr(lang)").get() or "unknown"
-
-        # Extract body content
-        body_html = response.css("body").get()
+        lang = _first(_XP_LANG(root)) or "unknown"
+
+        # Extract body content (serialized only if it will be stored)
+        body = _first(_XP_BODY(root)) if self.html_mode else None
+        body_html = (
+            etree.tostring(body, method="html", encoding="unicode", with_tail=False)
+            if body is not None
+            else None
+        )
 
         # Extract clean text from body (removing scripts, styles, etc.)
         body_text = self.extract_clean_text(response)
@@ -193,7 +239,7 @@ class RagSpider(scrapy.Spider):
             "keywords": keywords,
             "language": lang,
             # Content
-            "body_html": body_html,  # Full body HTML
+            **body_html_fields(body_html, self.html_mode),  # Full body HTML
             "body_text": body_text,  # Clean text only
             "text_length": len(body_text) if body_text else 0,
             # Technical metadata
@@ -202,14 +248,13 @@ class RagSpider(scrapy.Spider):
             "parsed_at_timestamp": datetime.utcnow().timestamp(),
         }
 
-        # Follow all same-domain links
-        current_domain = parsed_url.netloc
-        for link in response.css("a::attr(href)").getall():
+        # Follow all same-domain links (or www variant)
+        same_domains = self._domain_variants(parsed_url.netloc)
+        for link in _XP_LINKS(root):
             absolute_url = response.urljoin(link)
             link_domain = urlparse(absolute_url).netloc
 
-            # Check if link is same domain (or www variant)
-            if self._is_same_domain(current_domain, link_domain):
+            if link_domain in same_domains:
                 yield SplashRequest(
                     url=absolute_url,
                     callback=self.parse,
@@ -218,15 +263,9 @@ class RagSpider(scrapy.Spider):
                         "lua_source": self.lua_script,
                         "timeout": 120,
                     },
+                    cache_args=["lua_source"],
                 )
 
-    def _is_same_domain(self, domain1, domain2):
-        """Check if two domains are the same (accounting for www)"""
-        # Normalize domains (remove www)
-        d1 = domain1.replace("www.", "")
-        d2 = domain2.replace("www.", "")
-        return d1 == d2
-
     def extract_clean_text(self, response):
         """
         Extract clean text from body, removing:
@@ -235,34 +274,20 @@ class RagSpider(scrapy.Spider):
         - Comments
         - Extra whitespace
         """
-        # Remove script and style tags
-        body = response.css("body").get()
-        if not body:
+        # Parse once with selectolax (C parser, decodes HTML entities)
+        tree = HTMLParser(response.text)
+        if tree.body is None:
             return ""
 
-        # Remove script tags and their content
-        body = re.sub(
-            r"<script[^>]*>.*?</script>", "", body, flags=re.DOTALL | re.IGNORECASE
-        )
-
-        # Remove style tags and their content
-        body = re.sub(
-            r"<style[^>]*>.*?</style>", "", body, flags=re.DOTALL | re.IGNORECASE
-        )
-
-        # Remove HTML comments
-        body = re.sub(r"<!--.*?-->", "", body, flags=re.DOTALL)
-
-        # Remove all HTML tags
-        text = re.sub(r"<[^>]+>", " ", body)
-
-        # Decode HTML entities
-        from html import unescape
+        # Remove script and style tags with their content
+        for tag in tree.css("script, style"):
+            tag.decompose()
 
-        text = unescape(text)
+        # Comments are not text nodes, so they are skipped here
+        text = tree.body.text(separator=" ")
 
         # Clean up whitespace
-        text = re.sub(r"\s+", " ", text)
+        text = _RE_WS.sub(" ", text)
         text = text.strip()
 
         return text
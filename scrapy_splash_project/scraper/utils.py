@@ -0,0 +1,57 @@
+# Shared helpers used by spiders and pipelines
+
+import base64
+import hashlib
+
+try:
+    import zstandard
+except ImportError:  # only needed for STORE_BODY_HTML = "zstd"
+    zstandard = None
+
+
+def url_hash(url):
+    """
+    Return a short hex hash of a URL, used as page ID and in filenames.
+
+    Not meant to be cryptographic - only needs to be unique per URL.
+    Always blake2b (stdlib, fast) so IDs match on every machine.
+    """
+    return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+
+def body_html_mode(settings):
+    """
+    Read the STORE_BODY_HTML setting.
+
+    Returns "zstd" (compressed), "raw" (plain HTML) or None (don't store).
+    Call once at startup so a bad value or missing zstandard stops the
+    crawl right away instead of failing every callback.
+    """
+    if settings.get("STORE_BODY_HTML") == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                'STORE_BODY_HTML = "zstd" requires zstandard: pip install zstandard'
+            )
+        return "zstd"
+    try:
+        store = settings.getbool("STORE_BODY_HTML", True)
+    except ValueError:
+        raise ValueError(
+            f"STORE_BODY_HTML must be True, False or \"zstd\", "
+            f"got {settings.get('STORE_BODY_HTML')!r}"
+        ) from None
+    return "raw" if store else None
+
+
+# Shared across items, spider callbacks all run on the reactor thread
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+
+
+def body_html_fields(body_html, mode):
+    """Item fields holding the body HTML for the given body_html_mode()"""
+    if mode == "raw":
+        return {"body_html": body_html}
+    if mode == "zstd" and body_html:
+        compressed = _zstd_compressor.compress(body_html.encode())
+        return {"body_html_zstd_b64": base64.b64encode(compressed).decode("ascii")}
+    return {}
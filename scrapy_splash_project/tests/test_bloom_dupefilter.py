@@ -0,0 +1,44 @@
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+from scrapy_splash import SlotPolicy, SplashMiddleware, SplashRequest
+
+from scraper.bloom_dupefilter import BloomDupeFilter
+
+
+def _setup():
+    crawler = get_crawler(Spider, {"SPLASH_URL": "http://localhost:8050"})
+    spider = crawler._create_spider("test")
+    middleware = SplashMiddleware.from_crawler(crawler)
+    dupefilter = BloomDupeFilter.from_crawler(crawler)
+    return spider, middleware, dupefilter
+
+
+def _splash_request(url):
+    return SplashRequest(
+        url=url,
+        endpoint="execute",
+        args={"lua_source": "function main(splash) end", "timeout": 120},
+        # Per-domain slots need a running engine, not relevant for dedup
+        slot_policy=SlotPolicy.SCRAPY_DEFAULT,
+    )
+
+
+def test_rewritten_splash_requests_are_not_duplicates():
+    spider, middleware, dupefilter = _setup()
+
+    for url in ["https://example.com/a", "https://example.com/b"]:
+        request = _splash_request(url)
+        assert not dupefilter.request_seen(request)
+
+        # SplashMiddleware sends a POST to the Splash endpoint back
+        # through the scheduler; it must not collide with other pages
+        rewritten = middleware.process_request(request, spider)
+        assert rewritten.url == "http://localhost:8050/execute"
+        assert not dupefilter.request_seen(rewritten)
+
+
+def test_same_page_is_duplicate():
+    spider, middleware, dupefilter = _setup()
+
+    assert not dupefilter.request_seen(_splash_request("https://example.com/a"))
+    assert dupefilter.request_seen(_splash_request("https://example.com/a"))
@@ -0,0 +1,79 @@
+import asyncio
+
+import orjson
+import pytest
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from scraper.pipelines import RagPipeline
+
+
+def _crawl_jsonl(output_dir, items):
+    crawler = get_crawler(Spider, {"RAG_OUTPUT_FORMAT": "jsonl"})
+    spider = crawler._create_spider("test")
+    pipeline = RagPipeline()
+    pipeline.output_dir = output_dir
+    pipeline.open_spider(spider)
+    for item in items:
+        asyncio.run(pipeline.process_item(item, spider))
+    pipeline.close_spider(spider)
+
+
+@pytest.mark.parametrize(
+    "domain, expected",
+    [
+        ("example.com", "example_com"),
+        ("a.b.example.com", "example_com/a_b"),
+        ("localhost", "localhost"),
+        ("unknown", "unknown"),
+        ("", ""),
+    ],
+)
+def test_domain_folder(tmp_path, domain, expected):
+    pipeline = RagPipeline()
+    pipeline.output_dir = tmp_path
+
+    folder = pipeline._domain_folder(domain)
+
+    assert folder == tmp_path / expected
+    assert folder.is_dir()
+
+
+def test_write_json_keeps_non_ascii(tmp_path):
+    filepath = tmp_path / "page.json"
+
+    RagPipeline._write_json(filepath, {"title": "Ämter"})
+
+    assert "Ämter" in filepath.read_text(encoding="utf-8")
+    assert orjson.loads(filepath.read_bytes()) == {"title": "Ämter"}
+
+
+def _read_jsonl(path):
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def test_jsonl_rerun_does_not_duplicate_pages(tmp_path):
+    items = [
+        {"url": "https://example.com/a", "domain": "example.com"},
+        {"url": "https://example.com/b", "domain": "example.com"},
+    ]
+
+    _crawl_jsonl(tmp_path, items)
+    _crawl_jsonl(tmp_path, items)
+
+    pages = _read_jsonl(tmp_path / "example_com" / "pages.jsonl")
+    assert [page["url"] for page in pages] == [item["url"] for item in items]
+
+
+def test_jsonl_appends_between_flushes_of_one_crawl(tmp_path):
+    crawler = get_crawler(Spider, {"RAG_OUTPUT_FORMAT": "jsonl"})
+    spider = crawler._create_spider("test")
+    pipeline = RagPipeline()
+    pipeline.output_dir = tmp_path
+    pipeline.open_spider(spider)
+
+    filepath = tmp_path / "pages.jsonl"
+    pipeline._append_lines(filepath, [b'{"n": 1}\n'])
+    pipeline._append_lines(filepath, [b'{"n": 2}\n'])
+
+    assert _read_jsonl(filepath) == [{"n": 1}, {"n": 2}]
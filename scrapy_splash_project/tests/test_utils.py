@@ -0,0 +1,38 @@
+import base64
+
+import pytest
+import zstandard
+from scrapy.settings import Settings
+
+from scraper import utils
+from scraper.utils import body_html_fields, body_html_mode, url_hash
+
+
+def test_url_hash_is_stable():
+    # Page IDs and filenames depend on this value, it must never change
+    assert url_hash("https://example.com/x") == "2b1d24e3b69dab45b406459d4a40fb98"
+
+
+@pytest.mark.parametrize(
+    "value, mode",
+    [(True, "raw"), ("True", "raw"), (False, None), ("0", None), ("zstd", "zstd")],
+)
+def test_body_html_mode(value, mode):
+    assert body_html_mode(Settings({"STORE_BODY_HTML": value})) == mode
+
+
+def test_body_html_mode_rejects_unknown_value():
+    with pytest.raises(ValueError, match="STORE_BODY_HTML"):
+        body_html_mode(Settings({"STORE_BODY_HTML": "raw"}))
+
+
+def test_body_html_mode_zstd_requires_zstandard(monkeypatch):
+    monkeypatch.setattr(utils, "zstandard", None)
+    with pytest.raises(ImportError, match="zstandard"):
+        body_html_mode(Settings({"STORE_BODY_HTML": "zstd"}))
+
+
+def test_body_html_fields_zstd_roundtrip():
+    fields = body_html_fields("<body>Hallo</body>", "zstd")
+    compressed = base64.b64decode(fields["body_html_zstd_b64"])
+    assert zstandard.ZstdDecompressor().decompress(compressed) == b"<body>Hallo</body>"